@@ -1,9 +1,15 @@
 import os
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from xml.sax.saxutils import escape
 
-import requests
-from flask import Flask, jsonify
+import httpx
+import orjson
+import redis
+from flask import Flask
 from twilio.rest import Client
 
 app = Flask(__name__)
@@ -23,6 +29,63 @@ GROUP_SIZE = "40"
 # Duplicate alert prevention: don't re-notify within this many seconds
 COOLDOWN_SECONDS = 1800  # 30 minutes
 _last_notified = None
+_state_lock = threading.Lock()
+
+# Optional Redis for the cooldown state. The in-process global above is only
+# safe with a single Gunicorn worker on a single instance; set REDIS_URL to
+# enforce the cooldown across workers and Cloud Run instances.
+REDIS_URL = os.environ.get("REDIS_URL")
+_redis = redis.Redis.from_url(REDIS_URL, decode_responses=True) if REDIS_URL else None
+_COOLDOWN_KEY = "jpl:last_notified"
+
+# Background worker pool so /check can acknowledge Cloud Scheduler immediately
+# instead of holding its connection open through the JPL fetch + Twilio call.
+_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+
+# Response cache: availability can't meaningfully change between back-to-back
+# checks, so serve a recent answer instead of re-hitting the JPL API. A "found"
+# result gets a much shorter TTL so alerts aren't delayed, and a stale result
+# can still be served for a while if the API starts erroring.
+CACHE_TTL_SECONDS = 45
+CACHE_TTL_FOUND_SECONDS = 5
+CACHE_STALE_SECONDS = 600
+_cache = None  # {"tours_found": bool, "message": str, "ts": float}
+
+# Reuse one pooled HTTP/2 client across checks so each Cloud Scheduler tick
+# rides an existing keep-alive connection instead of paying DNS + TLS again.
+# Transport retries cover connection-level failures; httpx shares the pool
+# safely across the worker threads.
+_CLIENT = httpx.Client(
+    timeout=httpx.Timeout(12.0, connect=3.05),
+    transport=httpx.HTTPTransport(
+        http2=True,
+        retries=3,
+        limits=httpx.Limits(max_keepalive_connections=5),
+    ),
+    headers={
+        "User-Agent": (
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+        ),
+    },
+)
+
+# The one alert this service ever sends — build its TwiML once at import.
+# Anything else passed to send_call is XML-escaped before formatting.
+ALERT_MESSAGE = (
+    "Hi Alice! JPL Educational Group Tour dates are now available! "
+    "Go to the JPL tours page and book immediately. Good luck!"
+)
+_TWIML_TEMPLATE = '<Response><Say voice="alice" loop="2">{}</Say></Response>'
+_ALERT_TWIML = _TWIML_TEMPLATE.format(escape(ALERT_MESSAGE))
+
+# One Twilio client for the process lifetime — it wraps an HTTP session, so
+# rebuilding it per alert would throw away pooled connections to api.twilio.com.
+_twilio = (
+    Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+    if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN
+    else None
+)
 
 
 def check_jpl_tours():
@@ -31,47 +94,66 @@ def check_jpl_tours():
 
     Returns a tuple: (tours_found: bool, message: str)
     """
-    try:
-        log.info("Querying JPL tours API...")
-        resp = requests.post(
-            JPL_TOURS_API,
-            json={
-                "category_id": TOUR_CATEGORY_ID,
-                "group_size": GROUP_SIZE,
-                "pendingReservationId": None,
-            },
-            headers={
-                "User-Agent": (
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-                ),
-            },
-            timeout=15,
-        )
-        resp.raise_for_status()
-        data = resp.json()
+    log.info("Querying JPL tours API...")
+    resp = _CLIENT.post(
+        JPL_TOURS_API,
+        json={
+            "category_id": TOUR_CATEGORY_ID,
+            "group_size": GROUP_SIZE,
+            "pendingReservationId": None,
+        },
+    )
+    resp.raise_for_status()
+    data = orjson.loads(resp.content)
+
+    tours = data.get("public_tours", [])
+    if tours:
+        return True, f"{len(tours)} tour date(s) available!"
 
-        tours = data.get("public_tours", [])
-        if tours:
-            return True, f"{len(tours)} tour date(s) available!"
+    return False, "No tours available"
+
+
+def check_jpl_tours_cached():
+    """
+    Cached wrapper around check_jpl_tours.
 
-        return False, "No tours available"
+    Serves a recent result without touching the JPL API, and falls back to the
+    last good (stale) result if the API errors, so /check stays responsive
+    during JPL outages.
 
+    Returns a tuple: (tours_found: bool, message: str)
+    """
+    global _cache
+
+    now = time.time()
+    if _cache is not None:
+        ttl = CACHE_TTL_FOUND_SECONDS if _cache["tours_found"] else CACHE_TTL_SECONDS
+        if now - _cache["ts"] < ttl:
+            log.info("Serving cached tour check result")
+            return _cache["tours_found"], _cache["message"]
+
+    try:
+        tours_found, message = check_jpl_tours()
     except Exception as e:
         log.error(f"Error checking JPL tours: {e}")
+        if _cache is not None and now - _cache["ts"] < CACHE_STALE_SECONDS:
+            log.warning("Serving stale cached result while JPL API is failing")
+            return _cache["tours_found"], _cache["message"]
         return False, f"Error: {e}"
 
+    _cache = {"tours_found": tours_found, "message": message, "ts": now}
+    return tours_found, message
+
 
 def send_call(message):
     """Place a voice call via Twilio that reads a message aloud."""
-    if not all([TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER, YOUR_PHONE_NUMBER]):
+    if _twilio is None or not all([TWILIO_PHONE_NUMBER, YOUR_PHONE_NUMBER]):
         log.error("Twilio credentials not configured. Set environment variables.")
         return False
 
     try:
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        twiml = f'<Response><Say voice="alice" loop="2">{message}</Say></Response>'
-        call = client.calls.create(
+        twiml = _ALERT_TWIML if message == ALERT_MESSAGE else _TWIML_TEMPLATE.format(escape(message))
+        call = _twilio.calls.create(
             twiml=twiml,
             from_=TWILIO_PHONE_NUMBER,
             to=YOUR_PHONE_NUMBER,
@@ -83,30 +165,73 @@ def send_call(message):
         return False
 
 
+def _json_response(payload, status=200):
+    """Build a JSON response with orjson instead of Flask's jsonify."""
+    return app.response_class(orjson.dumps(payload), status=status, mimetype="application/json")
+
+
+def _in_cooldown(now):
+    """Return True if a notification was sent within the cooldown window."""
+    if _redis is not None:
+        try:
+            return _redis.exists(_COOLDOWN_KEY) > 0
+        except Exception as e:
+            log.error(f"Redis unavailable, falling back to local cooldown: {e}")
+    with _state_lock:
+        return bool(_last_notified and (now - _last_notified).total_seconds() < COOLDOWN_SECONDS)
+
+
+def _claim_notification(now):
+    """
+    Atomically claim the right to send a notification.
+
+    Returns False if another worker (or instance, when Redis is configured)
+    already notified within the cooldown window.
+    """
+    global _last_notified
+
+    if _redis is not None:
+        try:
+            # SET NX EX: only one caller can create the key per cooldown window.
+            return bool(_redis.set(_COOLDOWN_KEY, now.isoformat(), ex=COOLDOWN_SECONDS, nx=True))
+        except Exception as e:
+            log.error(f"Redis unavailable, falling back to local cooldown: {e}")
+    with _state_lock:
+        if _last_notified and (now - _last_notified).total_seconds() < COOLDOWN_SECONDS:
+            return False
+        _last_notified = now
+        return True
+
+
+def _run_check_and_notify():
+    """Check for tours and place the alert call. Runs on the worker pool."""
+    tours_found, message = check_jpl_tours_cached()
+    log.info(f"Check result: tours_found={tours_found}, message={message}")
+
+    if not tours_found:
+        return
+
+    now = datetime.now(timezone.utc)
+    if not _claim_notification(now):
+        log.info("Tours found but a notification was already sent — skipping call")
+        return
+
+    send_call(ALERT_MESSAGE)
+
+
 @app.route("/check", methods=["GET", "POST"])
 def check_endpoint():
     """Endpoint triggered by Cloud Scheduler to check for tours."""
-    global _last_notified
-
     # Cooldown check
     now = datetime.now(timezone.utc)
-    if _last_notified and (now - _last_notified).total_seconds() < COOLDOWN_SECONDS:
+    if _in_cooldown(now):
         log.info("Skipping check — still within notification cooldown period")
-        return jsonify({"status": "skipped", "reason": "cooldown"}), 200
-
-    tours_found, message = check_jpl_tours()
-    log.info(f"Check result: tours_found={tours_found}, message={message}")
-
-    if tours_found:
-        call_message = (
-            "Hi Alice! JPL Educational Group Tour dates are now available! "
-            "Go to the JPL tours page and book immediately. Good luck!"
-        )
-        send_call(call_message)
-        _last_notified = now
-        return jsonify({"status": "found", "message": message}), 200
+        return _json_response({"status": "skipped", "reason": "cooldown"})
 
-    return jsonify({"status": "not_found", "message": message}), 200
+    # Run the check (and any Twilio call) in the background so Cloud Scheduler
+    # gets its acknowledgement immediately instead of waiting out the JPL fetch.
+    _EXECUTOR.submit(_run_check_and_notify)
+    return _json_response({"status": "queued"}, status=202)
 
 
 @app.route("/test-call", methods=["GET"])
@@ -114,14 +239,14 @@ def test_call_endpoint():
     """Place a test call to verify Twilio is configured correctly."""
     success = send_call("This is a test call from your JPL Tour Notifier. If you hear this, notifications are working!")
     if success:
-        return jsonify({"status": "sent"}), 200
-    return jsonify({"status": "failed"}), 500
+        return _json_response({"status": "sent"})
+    return _json_response({"status": "failed"}, status=500)
 
 
 @app.route("/", methods=["GET"])
 def health():
     """Health check endpoint."""
-    return jsonify({"status": "ok", "service": "jpl-tour-notifier"}), 200
+    return _json_response({"status": "ok", "service": "jpl-tour-notifier"})
 
 
 if __name__ == "__main__":
@@ -131,13 +256,10 @@ if __name__ == "__main__":
         send_call("Test call from JPL Tour Notifier!")
     else:
         log.info("Running a one-time tour check...")
-        found, msg = check_jpl_tours()
+        found, msg = check_jpl_tours_cached()
         log.info(f"Result: found={found}, message={msg}")
         if found:
             log.info("Tours found! Calling you...")
-            send_call(
-                "Hi Alice! JPL Educational Group Tour dates are now available! "
-                "Go to the JPL tours page and book immediately. Good luck!"
-            )
+            send_call(ALERT_MESSAGE)
         else:
             log.info("No tours found at this time.")